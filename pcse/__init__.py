@@ -106,3 +106,38 @@ if not __stable__:
 def test(dsn=None):
     """Run all available tests for PCSE."""
     tests.test_all(dsn)
+
+def warmup():
+    """Pre-trigger JIT compilation of the numba-accelerated kernels.
+
+    The first call into a numba JIT kernel pays the compile latency, which
+    is annoying during interactive scenario exploration. Calling warmup()
+    moves that cost to a controlled preload phase; because the kernels are
+    compiled with cache=True, subsequent processes hit the on-disk cache
+    and start without compile delay at all.
+
+    Setting the environment variable PCSE_NUMBA_WARMUP=1 runs warmup() in
+    a background thread when the package is imported, so the import itself
+    returns immediately. Harmless (and fast) when numba is not installed
+    or when the compiled extension kernels are used instead.
+    """
+    import numpy as np
+    from .crop.abioticdamage import _frostol_kernel, _ceres_winterkill_kernel
+    from .batch import _lt50t_ensemble_recurrence
+
+    # Representative dummy inputs, only the argument types matter.
+    _frostol_kernel(0., 0., 0., False, -10., -0.6, -20., 0.0093, 2.7E-5,
+                    1.9, 0.54, 0., 0.08, 1.019)
+    _ceres_winterkill_kernel(0., 0., 0., 0., 0.5, -6., 0.1, 0.1, 0.02, -6.)
+    zeros2d = np.zeros((1, 1))
+    zeros1d = np.zeros(1)
+    _lt50t_ensemble_recurrence(zeros2d, zeros2d, zeros2d, zeros2d,
+                               zeros1d - 10., zeros1d - 20., zeros1d - 0.6,
+                               zeros1d + 1.9, np.empty((1, 1)),
+                               np.empty((1, 1)))
+
+if os.environ.get("PCSE_NUMBA_WARMUP") == "1":
+    import threading
+    _warmup_thread = threading.Thread(target=warmup)
+    _warmup_thread.daemon = True
+    _warmup_thread.start()
@@ -568,22 +568,29 @@ class RatesTemplate(StatesRatesCommon):
     variables).
     """
     
-    _rate_vars_zero = Instance(dict)    
+    _rate_vars_zero = Instance(dict)
     _vartype = "R"
 
+    # Subclasses whose calc_rates() is guaranteed to assign every declared
+    # rate variable on each time step can set this class attribute to True:
+    # zerofy() then skips the daily reset of the rates, see zerofy().
+    _all_written = False
+
     def __init__(self, kiosk=None, publish=None):
         """Set up the RatesTemplate and set monitoring on variables that
         have to be published.
         """
-        
+
         StatesRatesCommon.__init__(self, kiosk, publish)
-        
+
         # Determine the zero value for all rate variable if possible
         self._rate_vars_zero = self._find_rate_zero_values()
-        
-        # Initialize all rate variables to zero or False
-        self.zerofy()
-        
+
+        # Initialize all rate variables to zero or False. This is done
+        # unconditionally: the _all_written bypass only applies to the
+        # daily zerofy() calls issued by the engine.
+        self._trait_values.update(self._rate_vars_zero)
+
         # Lock the object to prevent further changes at this stage.
         self._locked = True
         
@@ -612,7 +619,14 @@ class RatesTemplate(StatesRatesCommon):
     def zerofy(self):
         """Sets the values of all rate values to zero (Int, Float)
         or False (Boolean).
+
+        The reset is skipped for subclasses that declare `_all_written`
+        True, stating the invariant that calc_rates() assigns every
+        declared rate variable each time step so the reset would only be
+        overwritten. The invariant is not checked.
         """
+        if self._all_written:
+            return
         self._trait_values.update(self._rate_vars_zero)
 
 #-------------------------------------------------------------------------------
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2004-2015 Alterra, Wageningen-UR
+"""Batch execution of PCSE components over a full weather series.
+
+The regular PCSE Engine advances day-by-day, dispatching through python
+for every embedded SimulationObject. For multi-decade or ensemble
+analyses with the frost damage modules this interpreter round trip
+dominates the runtime. The functions in this module instead stack the
+daily driving variables into numpy arrays and evaluate the winter-kill
+chain (CrownTemperature + FROSTOL) with vectorized kernels, making a
+single pass over the full time axis. Results are returned as plain numpy
+arrays keyed by the PCSE variable names.
+
+Currently only the winter-kill chain is supported; other components can
+be added here as they gain batch interfaces.
+"""
+from datetime import date, timedelta
+from math import exp
+
+import numpy as np
+
+from .base_classes import VariableKiosk
+from .crop.abioticdamage import (FROSTOL, _as_float_array, PRECISE_FROSTOL_EXP,
+                                 _EXP_C0, _EXP_C1, _EXP_C2, _EXP_C3, _EXP_C4)
+
+# numba is an optional dependency: with numba the ensemble recurrence is
+# compiled and parallelized over the member axis, without it the pure
+# python version below is used.
+try:
+    from numba import njit, prange
+    _HAVE_NUMBA = True
+except ImportError:
+    prange = range
+    _HAVE_NUMBA = False
+
+
+class WeatherArrays(object):
+    """Structure-of-arrays container for daily driving variables.
+
+    The day-by-day interface hands each model one WeatherDataContainer
+    per day, an array-of-structures layout. The batch kernels instead
+    want one contiguous array per field, so that only the fields actually
+    touched are pulled through the cache and numpy (or numba) can
+    vectorize along the time axis. All arrays are contiguous np.float32
+    and have one element per day.
+
+    :param days: sequence of dates, one per array element
+    :param TMIN: daily minimum temperature [C]
+    :param TMAX: daily maximum temperature [C]
+    :param TEMP: daily average temperature [C]
+    :param SNOWDEPTH: daily depth of snow cover [cm]
+    """
+
+    fields = ["TMIN", "TMAX", "TEMP", "SNOWDEPTH"]
+
+    def __init__(self, days, TMIN, TMAX, TEMP, SNOWDEPTH):
+        self.days = list(days)
+        self.TMIN = np.ascontiguousarray(TMIN, dtype=np.float32)
+        self.TMAX = np.ascontiguousarray(TMAX, dtype=np.float32)
+        self.TEMP = np.ascontiguousarray(TEMP, dtype=np.float32)
+        self.SNOWDEPTH = np.ascontiguousarray(SNOWDEPTH, dtype=np.float32)
+        for field in self.fields:
+            if len(getattr(self, field)) != len(self.days):
+                msg = "Length of %s does not match number of days." % field
+                raise ValueError(msg)
+
+    def __len__(self):
+        return len(self.days)
+
+    @classmethod
+    def from_provider(cls, wdp, start_day, end_day):
+        """Fills the arrays from a WeatherDataProvider.
+
+        :param wdp: a WeatherDataProvider instance
+        :param start_day: first day of the series (datetime.date)
+        :param end_day: last day of the series (datetime.date), inclusive
+        """
+        days = []
+        rows = {field: [] for field in cls.fields}
+        one_day = timedelta(days=1)
+        day = start_day
+        while day <= end_day:
+            wdc = wdp(day)
+            days.append(day)
+            rows["TMIN"].append(wdc.TMIN)
+            rows["TMAX"].append(wdc.TMAX)
+            # TEMP and SNOWDEPTH are optional on a WeatherDataContainer
+            rows["TEMP"].append(getattr(wdc, "TEMP",
+                                        (wdc.TMIN + wdc.TMAX)/2.))
+            rows["SNOWDEPTH"].append(getattr(wdc, "SNOWDEPTH", 0.))
+            day += one_day
+        return cls(days, rows["TMIN"], rows["TMAX"], rows["TEMP"],
+                   rows["SNOWDEPTH"])
+
+
+def crown_temperature_series(tmin, tmax, temp, snow_depth,
+                             CROWNTMPA, CROWNTMPB):
+    """Vectorized equivalent of the CrownTemperature model.
+
+    :param tmin: daily minimum temperature, 1D array [C]
+    :param tmax: daily maximum temperature, 1D array [C]
+    :param temp: daily average temperature, 1D array [C]
+    :param snow_depth: daily depth of snow cover, 1D array [cm]
+    :param CROWNTMPA: A parameter in equation for crown temperature
+    :param CROWNTMPB: B parameter in equation for crown temperature
+    :returns: a tuple of arrays (TMIN_CROWN, TMAX_CROWN, TEMP_CROWN)
+    """
+    # The dtype of float input arrays is preserved, so float32 weather
+    # (e.g. from WeatherArrays) is processed in single precision.
+    tmin = _as_float_array(tmin)
+    tmax = _as_float_array(tmax)
+    temp = _as_float_array(temp)
+    snow_depth = _as_float_array(snow_depth)
+
+    RSD = np.clip(snow_depth, 0., 15.)/15.
+    t = 1. - RSD
+    factor = CROWNTMPA + CROWNTMPB*t*t
+
+    # The crown temperature is only estimated when TMIN < 0, otherwise
+    # the air temperatures are passed through unaltered.
+    cold = tmin < 0.
+    tmin_crown = np.where(cold, tmin*factor, tmin)
+    tmax_crown = np.where(cold, tmax*factor, tmax)
+    temp_crown = np.where(cold, (tmin_crown + tmax_crown)/2., temp)
+    return (tmin_crown, tmax_crown, temp_crown)
+
+
+def run_frostol(parvalues, tmin, tmax, temp, snow_depth, isVernalized,
+                start_day=None):
+    """Runs the winter-kill chain over a full weather series in one pass.
+
+    The daily crown temperatures are derived with
+    `crown_temperature_series()` after which the FROSTOL rates and the
+    course of LT50T are computed through `FROSTOL.calc_rates_series()`.
+    The results are identical to stepping CrownTemperature and FROSTOL
+    through the daily interface.
+
+    :param parvalues: dict with parameter key/value pairs for FROSTOL and
+        CrownTemperature
+    :param tmin: daily minimum temperature, 1D array [C]
+    :param tmax: daily maximum temperature, 1D array [C]
+    :param temp: daily average temperature, 1D array [C]
+    :param snow_depth: daily depth of snow cover, 1D array [cm]
+    :param isVernalized: daily vernalisation state of the crop, either a
+        1D boolean array or a single bool applied to all days
+    :param start_day: start date of the series, only used for
+        initializing the FROSTOL object (defaults to 2000-01-01)
+    :returns: a dict of 1D arrays with the daily values of TMIN_CROWN,
+        TMAX_CROWN, TEMP_CROWN, the FROSTOL rates, RF_FROST, the LT50T
+        state at the start of each day and the cumulative number of days
+        with frost stress (IDFST) at the end of each day.
+    """
+    if start_day is None:
+        start_day = date(2000, 1, 1)
+
+    snow_depth = _as_float_array(snow_depth)
+    isVernalized = np.asarray(isVernalized, dtype=bool)
+    if isVernalized.ndim == 0:
+        isVernalized = np.full_like(snow_depth, bool(isVernalized),
+                                    dtype=bool)
+
+    (tmin_crown, tmax_crown, temp_crown) = crown_temperature_series(
+        tmin, tmax, temp, snow_depth,
+        parvalues["CROWNTMPA"], parvalues["CROWNTMPB"])
+
+    # A throw-away kiosk: the batch interface does not publish variables,
+    # the kiosk is only needed to instantiate the FROSTOL object.
+    kiosk = VariableKiosk()
+    frostol = FROSTOL(start_day, kiosk, parvalues)
+    results = frostol.calc_rates_series(temp_crown, tmin_crown, snow_depth,
+                                        isVernalized)
+
+    results["TMIN_CROWN"] = tmin_crown
+    results["TMAX_CROWN"] = tmax_crown
+    results["TEMP_CROWN"] = temp_crown
+    results["IDFST"] = np.cumsum(results["IDFS"])
+    return results
+
+
+def lt50t_closed_form(hcoef, dcoef, rdh_resp, temp_crown, lt50t0,
+                      LT50C, LT50I, FROSTOL_S, tstr_tol=1.E-12,
+                      chunk=64):
+    """Evaluates the LT50T recurrence with vectorized closed-form segments.
+
+    The daily update of LT50T looks inherently serial, but on days where
+    the temperature stress term RDH_TSTR is negligible it reduces to the
+    linear recurrence ``x[t+1] = a[t]*x[t] + b[t]`` with
+    ``a = 1 - hcoef - dcoef`` and ``b = hcoef*LT50C + dcoef*LT50I +
+    rdh_resp``, whose closed form over a run of days is a cumulative
+    product/sum. RDH_TSTR only departs from zero when the crown
+    temperature comes close to LT50T, i.e. during frost events: its
+    magnitude is bounded over the admissible range [LT50C, LT50I]
+    beforehand, and only days where that bound exceeds `tstr_tol` (plus
+    days where the [LT50C, LT50I] limit actually triggers) are stepped
+    serially. On multi-year series where frost events are rare this
+    evaluates nearly the whole series with numpy.
+
+    The result agrees with the serial recurrence of
+    `FROSTOL.calc_rates_series()` to within roughly ``ndays*tstr_tol``
+    plus rounding; it is not bit-identical. The closed form is always
+    evaluated in double precision.
+
+    :param hcoef: hardening coefficient per day, RH = hcoef*(LT50T-LT50C)
+    :param dcoef: dehardening coefficient per day,
+        RDH_TEMP = dcoef*(LT50I-LT50T)
+    :param rdh_resp: respiration stress rate per day
+    :param temp_crown: crown temperature per day [C]
+    :param lt50t0: initial LT50T state
+    :param LT50C: LT50 of a fully hardened crop [C]
+    :param LT50I: LT50 of a fully dehardened crop [C]
+    :param FROSTOL_S: low temperature stress parameter
+    :param tstr_tol: largest RDH_TSTR magnitude treated as negligible
+    :param chunk: maximum closed-form segment length, limits the dynamic
+        range of the cumulative products
+    :returns: array with the LT50T state at the start of each day, like
+        the LT50T series of `FROSTOL.calc_rates_series()`
+    """
+    hcoef = np.asarray(hcoef, dtype=np.float64)
+    dcoef = np.asarray(dcoef, dtype=np.float64)
+    rdh_resp = np.asarray(rdh_resp, dtype=np.float64)
+    temp_crown = np.asarray(temp_crown, dtype=np.float64)
+    ndays = len(temp_crown)
+
+    a = 1. - hcoef - dcoef
+    b = hcoef*LT50C + dcoef*LT50I + rdh_resp
+
+    # Bound |RDH_TSTR| over LT50T in [LT50C, LT50I]. With
+    # g(d) = d*exp(FROSTOL_S*d + 3.74) and d = LT50T - TEMP_CROWN the
+    # extremes lie at the interval ends or at the interior stationary
+    # point d = -1/FROSTOL_S.
+    def g_abs(d):
+        return np.abs(d)*np.exp(FROSTOL_S*d + 3.74)
+    dlo = LT50C - temp_crown
+    dhi = LT50I - temp_crown
+    dstar = -1./FROSTOL_S
+    bound = np.maximum(g_abs(dlo), g_abs(dhi))
+    bound = np.where((dlo < dstar) & (dstar < dhi),
+                     np.maximum(bound, g_abs(dstar)), bound)
+    # The closed form also requires a away from zero, so that the
+    # cumulative products stay invertible; warm days with a strong
+    # dehardening pull are stepped serially instead.
+    analytic = (bound <= tstr_tol) & (a > 0.1)
+
+    LT50T = np.empty(ndays, dtype=np.float64)
+    x = float(lt50t0)
+    t = 0
+    while t < ndays:
+        if not analytic[t]:
+            # serial step including the full temperature stress term
+            LT50T[t] = x
+            dT = x - temp_crown[t]
+            x += (-hcoef[t]*(x - LT50C) + dcoef[t]*(LT50I - x) +
+                  rdh_resp[t] + dT * 1./exp(-FROSTOL_S * dT - 3.74))
+            x = min(max(x, LT50C), LT50I)
+            t += 1
+            continue
+
+        # closed form over the next analytic stretch
+        stretch = analytic[t:t + chunk]
+        if stretch.all():
+            e = min(t + chunk, ndays)
+        else:
+            e = t + int(np.argmin(stretch))
+        A = np.cumprod(a[t:e])
+        S = np.cumsum(b[t:e]/A)
+        xs = np.empty(e - t + 1, dtype=np.float64)
+        xs[0] = x
+        xs[1:] = A*(x + S)
+
+        # fix up at the first day where the [LT50C, LT50I] limit would
+        # have triggered, then restart the closed form from there
+        violated = (xs[1:] < LT50C) | (xs[1:] > LT50I)
+        if violated.any():
+            j = int(np.argmax(violated))
+            LT50T[t:t + j + 1] = xs[:j + 1]
+            x = min(max(xs[j + 1], LT50C), LT50I)
+            t += j + 1
+        else:
+            LT50T[t:e] = xs[:-1]
+            x = xs[-1]
+            t = e
+    return LT50T
+
+
+def _lt50t_ensemble_recurrence(hcoef, dcoef, rdh_resp, temp_crown, lt50t0,
+                               LT50C, LT50I, FROSTOL_S, LT50T, RDH_TSTR):
+    """Serial LT50T recurrence for every ensemble member.
+
+    The daily carry dependency through the [LT50C, LT50I] limit makes the
+    inner loop over days inherently serial, but the outer loop over
+    ensemble members (sites, parameter sets) is embarrassingly parallel:
+    with numba it is compiled with parallel=True and runs one member per
+    core through prange. The LT50T and RDH_TSTR output arrays are filled
+    in place.
+    """
+    nmembers, ndays = temp_crown.shape
+    for i in prange(nmembers):
+        lt50t = lt50t0[i]
+        lt50c = LT50C[i]
+        lt50i = LT50I[i]
+        frostol_s = FROSTOL_S[i]
+        for t in range(ndays):
+            LT50T[i, t] = lt50t
+            dT = lt50t - temp_crown[i, t]
+            rdh_tstr = dT * 1./exp(-frostol_s * dT - 3.74)
+            RDH_TSTR[i, t] = rdh_tstr
+            lt50t += (-hcoef[i, t]*(lt50t - lt50c) +
+                      dcoef[i, t]*(lt50i - lt50t) +
+                      rdh_resp[i, t] + rdh_tstr)
+            if lt50t < lt50c:
+                lt50t = lt50c
+            elif lt50t > lt50i:
+                lt50t = lt50i
+
+if _HAVE_NUMBA:
+    _lt50t_ensemble_recurrence = njit(cache=True, parallel=True)(
+        _lt50t_ensemble_recurrence)
+
+
+def run_frostol_ensemble(parvalues_list, tmin, tmax, temp, snow_depth,
+                         isVernalized):
+    """Runs the winter-kill chain for an ensemble of sites/parameter sets.
+
+    All state-independent terms are evaluated with numpy over the full
+    (member, day) plane; the serial LT50T recurrence runs per member and
+    is parallelized over the member axis when numba is available. Each
+    member i produces the same results as
+    `run_frostol(parvalues_list[i], ...)` on its own weather row.
+
+    :param parvalues_list: sequence of parameter dicts, one per member
+    :param tmin: daily minimum temperature, 2D array (nmembers, ndays) [C]
+    :param tmax: daily maximum temperature, 2D array [C]
+    :param temp: daily average temperature, 2D array [C]
+    :param snow_depth: daily depth of snow cover, 2D array [cm]
+    :param isVernalized: daily vernalisation state, a single bool or an
+        array broadcastable to (nmembers, ndays)
+    :returns: a dict of 2D arrays (nmembers, ndays), with the same keys
+        as `run_frostol()`.
+    """
+    tmin = np.atleast_2d(_as_float_array(tmin))
+    tmax = np.atleast_2d(_as_float_array(tmax))
+    temp = np.atleast_2d(_as_float_array(temp))
+    snow_depth = np.atleast_2d(_as_float_array(snow_depth))
+    nmembers, ndays = tmin.shape
+    dtype = tmin.dtype
+    isVernalized = np.broadcast_to(np.asarray(isVernalized, dtype=bool),
+                                   (nmembers, ndays))
+
+    # Per-member parameter columns that broadcast over the day axis
+    def par_column(name):
+        values = [float(parvalues[name]) for parvalues in parvalues_list]
+        return np.asarray(values, dtype=dtype)[:, np.newaxis]
+
+    CROWNTMPA = par_column("CROWNTMPA")
+    CROWNTMPB = par_column("CROWNTMPB")
+    LT50C = par_column("LT50C")
+    FROSTOL_H = par_column("FROSTOL_H")
+    FROSTOL_D = par_column("FROSTOL_D")
+    FROSTOL_S = par_column("FROSTOL_S")
+    FROSTOL_R = par_column("FROSTOL_R")
+    FROSTOL_SDBASE = par_column("FROSTOL_SDBASE")
+    FROSTOL_SDMAX = par_column("FROSTOL_SDMAX")
+    FROSTOL_KILLCF = par_column("FROSTOL_KILLCF")
+    LT50I = -0.6 + 0.142*LT50C
+
+    # Crown temperatures over the full (member, day) plane
+    RSD = np.clip(snow_depth, 0., 15.)/15.
+    t = 1. - RSD
+    factor = CROWNTMPA + CROWNTMPB*t*t
+    cold = tmin < 0.
+    tmin_crown = np.where(cold, tmin*factor, tmin)
+    tmax_crown = np.where(cold, tmax*factor, tmax)
+    temp_crown = np.where(cold, (tmin_crown + tmax_crown)/2., temp)
+
+    # State-independent coefficients, see FROSTOL.calc_rates_series()
+    xTC = np.clip(temp_crown, 0., 10.)
+    hcoef = np.where((~isVernalized) & (temp_crown < 10.),
+                     FROSTOL_H * (10. - xTC), 0.)
+    TCcrit = np.where(isVernalized, -4., 10.)
+    u = temp_crown + 4
+    dcoef = np.where(temp_crown > TCcrit,
+                     FROSTOL_D * (u*u*u), 0.)
+
+    xTC = np.where(temp_crown > -2.5, temp_crown, -2.5)
+    u = 0.84 + 0.051*xTC
+    expu = (((_EXP_C4*u + _EXP_C3)*u + _EXP_C2)*u + _EXP_C1)*u + _EXP_C0
+    if PRECISE_FROSTOL_EXP:
+        expu = np.exp(u)
+    else:
+        expu = np.where(xTC > 15., np.exp(u), expu)
+    Resp = (expu - 2.)/1.85
+    Fsnow = (snow_depth - FROSTOL_SDBASE)/(FROSTOL_SDMAX - FROSTOL_SDBASE)
+    Fsnow = np.clip(Fsnow, 0., 1.)
+    RDH_RESP = FROSTOL_R * Resp * Fsnow
+
+    # Serial integration per member, parallel over the member axis
+    LT50T = np.empty((nmembers, ndays), dtype=dtype)
+    RDH_TSTR = np.empty((nmembers, ndays), dtype=dtype)
+    _lt50t_ensemble_recurrence(
+        np.ascontiguousarray(hcoef), np.ascontiguousarray(dcoef),
+        np.ascontiguousarray(RDH_RESP), np.ascontiguousarray(temp_crown),
+        LT50I[:, 0].copy(), LT50C[:, 0].copy(), LT50I[:, 0].copy(),
+        FROSTOL_S[:, 0].copy(), LT50T, RDH_TSTR)
+
+    RH = hcoef * (LT50T - LT50C)
+    RDH_TEMP = dcoef * (LT50I - LT50T)
+
+    killfactor = 1/(1 + np.exp((tmin_crown - LT50T)/FROSTOL_KILLCF))
+    killfactor = np.where(killfactor < 0.05, 0., killfactor)
+    killfactor = np.where(killfactor > 0.95, 1., killfactor)
+    IDFS = np.where(killfactor > 0., 1, 0)
+
+    return {"RH": RH, "RDH_TEMP": RDH_TEMP, "RDH_RESP": RDH_RESP,
+            "RDH_TSTR": RDH_TSTR, "IDFS": IDFS, "RF_FROST": killfactor,
+            "LT50T": LT50T, "TMIN_CROWN": tmin_crown,
+            "TMAX_CROWN": tmax_crown, "TEMP_CROWN": temp_crown,
+            "IDFST": np.cumsum(IDFS, axis=1)}
+
+
+def run_frostol_provider(parvalues, wdp, start_day, end_day, isVernalized):
+    """Convenience wrapper around run_frostol() that takes the weather
+    directly from a WeatherDataProvider.
+
+    The daily records for [start_day, end_day] are stacked into a
+    WeatherArrays container first, see `WeatherArrays.from_provider()`.
+    """
+    weather = WeatherArrays.from_provider(wdp, start_day, end_day)
+    return run_frostol(parvalues, weather.TMIN, weather.TMAX, weather.TEMP,
+                       weather.SNOWDEPTH, isVernalized, start_day)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2004-2015 Alterra, Wageningen-UR
+# cython: boundscheck=False
+# cython: cdivision=True
+"""Cython implementation of the frost damage kernels.
+
+Mirrors _frostol_kernel() and _ceres_winterkill_kernel() from
+pcse.crop.abioticdamage for deployments without numba (e.g. minimal
+docker images): one compile at wheel build time, no runtime dependency
+and no JIT warm-up. abioticdamage prefers these kernels when the
+extension was built; the python versions remain the reference
+implementation and must be kept in sync with this file.
+
+Note that the PRECISE_FROSTOL_EXP flag of abioticdamage does not affect
+the compiled kernels; use the python kernels for regression validation
+with the exact exponential.
+"""
+from libc.math cimport exp
+
+# Degree-4 polynomial approximation of exp(u) on [0.7125, 1.605], see
+# the coefficients in pcse.crop.abioticdamage.
+DEF EXP_C0 = 1.038269063490997
+DEF EXP_C1 = 0.826638675798168
+DEF EXP_C2 = 0.802326896654832
+DEF EXP_C3 = -0.08277815277798985
+DEF EXP_C4 = 0.13385324304920562
+
+
+def frostol_kernel(double TEMP_CROWN, double TMIN_CROWN, double SNOWDEPTH,
+                   bint isVernalized, double LT50T, double LT50I,
+                   double LT50C, double FROSTOL_H, double FROSTOL_D,
+                   double FROSTOL_S, double FROSTOL_R, double FROSTOL_SDBASE,
+                   double SD_RANGE_INV, double FROSTOL_KILLCF):
+    """Scalar arithmetic of FROSTOL.calc_rates() on plain C doubles.
+
+    Returns the tuple (RH, RDH_TEMP, RDH_RESP, RDH_TSTR, IDFS, killfactor).
+    """
+    cdef double RH, RDH_TEMP, RDH_RESP, RDH_TSTR, killfactor
+    cdef double xTC, TCcrit, u, expu, Resp, Fsnow, uT
+    cdef int IDFS
+
+    # Hardening
+    if (not isVernalized) and (TEMP_CROWN < 10.):
+        xTC = min(10., max(0., TEMP_CROWN))
+        RH = FROSTOL_H * (10. - xTC)*(LT50T - LT50C)
+    else:
+        RH = 0.
+
+    # Dehardening
+    TCcrit = (10. if (not isVernalized) else -4.)
+    if TEMP_CROWN > TCcrit:
+        uT = TEMP_CROWN + 4
+        RDH_TEMP = FROSTOL_D * (LT50I - LT50T) * (uT*uT*uT)
+    else:
+        RDH_TEMP = 0.
+
+    # Stress due to respiration under snow coverage
+    xTC = (TEMP_CROWN if TEMP_CROWN > -2.5 else -2.5)
+    u = 0.84 + 0.051*xTC
+    if xTC > 15.:
+        expu = exp(u)
+    else:
+        expu = (((EXP_C4*u + EXP_C3)*u + EXP_C2)*u + EXP_C1)*u + EXP_C0
+    Resp = (expu - 2.)/1.85
+
+    Fsnow = (SNOWDEPTH - FROSTOL_SDBASE) * SD_RANGE_INV
+    Fsnow = min(1., max(0., Fsnow))
+    RDH_RESP = FROSTOL_R * Resp * Fsnow
+
+    # Stress due to low temperatures
+    RDH_TSTR = (LT50T - TEMP_CROWN) * \
+                1./exp(-FROSTOL_S * (LT50T - TEMP_CROWN) - 3.74)
+
+    # kill factor using logistic function with branchless limits
+    killfactor = 1/(1 + exp((TMIN_CROWN - LT50T)/FROSTOL_KILLCF))
+    killfactor = killfactor * (killfactor >= 0.05)
+    killfactor = killfactor + (1. - killfactor) * (killfactor > 0.95)
+
+    # Frost stress occurring yes/no
+    IDFS = (killfactor > 0.)
+
+    return (RH, RDH_TEMP, RDH_RESP, RDH_TSTR, IDFS, killfactor)
+
+
+def ceres_winterkill_kernel(double TEMP_CROWN, double TMIN_CROWN,
+                            double TMAX_CROWN, double SNOWDEPTH,
+                            double HARDINDEX, double HIKILLTEMP,
+                            double CWWK_HC_S1, double CWWK_HC_S2,
+                            double CWWK_DHC, double CWWK_KILLTEMP):
+    """Scalar arithmetic of CERES_WinterKill.calc_rates() on C doubles.
+
+    Returns the tuple (RH, RDH, HIKILLFACTOR, crop_killed).
+    """
+    cdef double RH, RDH, HIKILLFACTOR, KF, u
+    cdef bint crop_killed
+
+    if HARDINDEX >= 1.:  # HI between 1 and 2.
+        if TEMP_CROWN < 0.:
+            RH = CWWK_HC_S2
+        else:
+            RH = 0.
+    else:  # HI between 0 and 1
+        if (TEMP_CROWN > -1.) and (TEMP_CROWN < 8.):
+            u = 3.5 - TEMP_CROWN
+            RH = CWWK_HC_S1 - (u*u/506.)
+        else:
+            RH = 0.
+
+    # Dehardening
+    if TMAX_CROWN > 10:
+        RDH = (10 - TMAX_CROWN) * CWWK_DHC
+    else:
+        RDH = 0.
+
+    # Killing factor based on the current kill temperature
+    crop_killed = False
+    if TMIN_CROWN < HIKILLTEMP:
+        HIKILLFACTOR = 1.
+        crop_killed = True
+    elif TMIN_CROWN > CWWK_KILLTEMP:
+        HIKILLFACTOR = 0.
+    else:
+        KF = (0.02 * HARDINDEX - 0.1) * \
+              ((TMIN_CROWN * 0.85) + (TMAX_CROWN * 0.15) + \
+               10 + (0.25 * SNOWDEPTH))
+        HIKILLFACTOR = min(0.96, max(0., KF))
+
+    return (RH, RDH, HIKILLFACTOR, crop_killed)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2004-2015 Alterra, Wageningen-UR
+"""Ahead-of-time compilation of the frost damage kernels with numba.pycc.
+
+Building the `pcse_frost_native` extension moves the numba compilation
+cost from the first simulation (JIT) to the package build, so that
+neither the interpreter overhead nor the JIT warm-up is paid at runtime.
+The extension is entirely optional: `abioticdamage` falls back to JIT
+compilation and finally to the pure python kernels when it is absent.
+
+The module can be built standalone with::
+
+    python -m pcse.crop._frost_aot
+
+or as part of the package build through setup.py.
+"""
+from numba.pycc import CC
+
+from .abioticdamage import _frostol_kernel
+
+cc = CC('pcse_frost_native')
+
+# When numba is installed the kernel in abioticdamage is already
+# JIT-wrapped; the original python function is needed for the AOT export.
+_frostol_py = getattr(_frostol_kernel, "py_func", _frostol_kernel)
+
+cc.export('frostol_kernel',
+          'Tuple((f8, f8, f8, f8, i8, f8))'
+          '(f8, f8, f8, b1, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8)')(
+              _frostol_py)
+
+if __name__ == "__main__":
+    cc.compile()
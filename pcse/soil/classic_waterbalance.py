@@ -9,7 +9,7 @@ from math import sqrt
 
 from ..traitlets import Float, Int, Instance, Enum, Unicode, Bool
 from ..decorators import prepare_rates, prepare_states
-from ..util import limit, Afgen, merge_dict
+from ..util import limit, Afgen, merge_dict, specialized_dispatcher
 from ..base_classes import ParamTemplate, StatesTemplate, RatesTemplate, \
      SimulationObject
 from .. import signals
@@ -580,6 +580,19 @@ class WaterbalanceFDSnow(SimulationObject):
         self.waterbalance = WaterbalanceFD(day, kiosk, parvalues)
         self.snowcover = SnowMAUS(day, kiosk, parvalues)
 
+        # Generate dispatchers specialized for this instance with the
+        # sub-model steppers pre-resolved. They shadow the generic methods
+        # below, removing the trait attribute lookups and the forwarding
+        # frame from the daily dispatch. The generic methods remain as
+        # documentation and as fallback for subclasses that override
+        # initialize().
+        self.calc_rates = specialized_dispatcher(
+            "calc_rates", ["day", "drv"],
+            [self.waterbalance.calc_rates, self.snowcover.calc_rates])
+        self.integrate = specialized_dispatcher(
+            "integrate", ["day"],
+            [self.waterbalance.integrate, self.snowcover.integrate])
+
     def calc_rates(self, day, drv):
         self.waterbalance.calc_rates(day, drv)
         self.snowcover.calc_rates(day, drv)
@@ -6,6 +6,7 @@
 import unittest
 import test_assimilation
 import test_abioticdamage
+import test_batch
 import test_partitioning
 import test_evapotranspiration
 import test_respiration
@@ -16,6 +17,7 @@ def make_test_suite(dsn=None):
     """Assemble test suite and return it
     """
     allsuites = unittest.TestSuite([test_abioticdamage.suite(),
+                                    test_batch.suite(),
                                     test_assimilation.suite(),
                                     test_partitioning.suite(),
                                     test_evapotranspiration.suite(),
@@ -3,8 +3,9 @@
 # Allard de Wit (allard.dewit@wur.nl), April 2014
 import unittest
 from datetime import date
+from collections import namedtuple
 
-from ..crop.abioticdamage import FROSTOL
+from ..crop.abioticdamage import FROSTOL, CERES_WinterKill
 from ..base_classes import VariableKiosk
 from .test_data import frostol_testdata
 
@@ -63,10 +64,132 @@ class Test_FROSTOL(unittest.TestCase):
             # integrate
             self.frostol.integrate(day)
 
+#------------------------------------------------------------------------------
+class Test_FROSTOL_series(Test_FROSTOL):
+    """Tests that FROSTOL.calc_rates_series() reproduces the results of the
+    day-by-day calc_rates()/integrate() interface on the reference dataset.
+    """
+
+    series_vars = ["LT50T", "RH", "RDH_TEMP", "RDH_RESP", "RDH_TSTR",
+                   "RF_FROST"]
+    def runTest(self):
+        days = range(1, 252)
+
+        # Stack the driving variables of the test set into arrays. With
+        # testing=True the crown temperature module returns TMIN_CROWN=0.
+        temp_crown = [self.testdata[day].TEMP_CROWN for day in days]
+        tmin_crown = [0.]*len(temp_crown)
+        snow_depth = [self.testdata[day].snow_depth for day in days]
+        isVernalized = [(self.testdata[day].fV >= 0.99) for day in days]
+
+        batch = self.frostol.calc_rates_series(temp_crown, tmin_crown,
+                                               snow_depth, isVernalized)
+
+        # Run the scalar interface over the same series and check that the
+        # batch results are identical.
+        for it, day in enumerate(days):
+            drvref = self.testdata[day]
+            self.kiosk.set_variable(0, "ISVERNALISED", isVernalized[it])
+            self.kiosk.set_variable(0, "SNOWDEPTH", drvref.snow_depth)
+            self.frostol.calc_rates(day, drvref)
+            for var in self.series_vars:
+                refvalue = self.frostol.get_variable(var)
+                self.assertAlmostEqual(refvalue, batch[var][it], places=8)
+            self.frostol.integrate(day)
+
+#------------------------------------------------------------------------------
+class Test_FROSTOL_zerofy_bypass(Test_FROSTOL):
+    """Tests that the rate variables of FROSTOL survive zerofy(): its
+    RateVariables declare _all_written as calc_rates() assigns every rate
+    on every time step, so the daily reset is skipped.
+    """
+
+    def runTest(self):
+        drvref = self.testdata[1]
+        self.kiosk.set_variable(0, "ISVERNALISED", False)
+        self.kiosk.set_variable(0, "SNOWDEPTH", drvref.snow_depth)
+        self.frostol.calc_rates(date(2000, 1, 1), drvref)
+
+        values = {var: self.frostol.get_variable(var)
+                  for var in ["RH", "RDH_TEMP", "RDH_RESP", "RDH_TSTR"]}
+        self.frostol.zerofy()
+        for var, value in values.items():
+            self.assertEqual(self.frostol.get_variable(var), value)
+
+#------------------------------------------------------------------------------
+class Test_CERESWinterKill(unittest.TestCase):
+    """Testing suite for CERES_WinterKill, covering the hardening stages,
+    dehardening and the partial/complete kill branches.
+    """
+
+    CrownTemps = namedtuple("CrownTemps",
+                            ["TEMP_CROWN", "TMIN_CROWN", "TMAX_CROWN"])
+    parvalues = {"CWWK_HC_S1": 0.1, "CWWK_HC_S2": 0.1, "CWWK_DHC": 0.02,
+                 "CWWK_KILLTEMP": -6.}
+
+    def setUp(self):
+        self.kiosk = VariableKiosk()
+        self.kiosk.register_variable(0, "SNOWDEPTH", type="S", publish=True)
+        self.kiosk.set_variable(0, "SNOWDEPTH", 0.)
+        dummyday = date(2000, 1, 1)
+        self.wk = CERES_WinterKill(dummyday, self.kiosk, self.parvalues)
+
+    def runTest(self):
+        day = date(2000, 1, 1)
+
+        # Eleven days of stage 1 hardening at the optimum temperature:
+        # RH = CWWK_HC_S1 each day, no dehardening, no kill. Eleven days
+        # are used (not ten) so the accumulated index passes 1 despite
+        # floating point round-off in the summation of 0.1.
+        for i in range(11):
+            drv = self.CrownTemps(TEMP_CROWN=3.5, TMIN_CROWN=0., TMAX_CROWN=5.)
+            self.wk.calc_rates(day, drv)
+            self.assertAlmostEqual(self.wk.get_variable("RH"), 0.1, places=8)
+            self.assertAlmostEqual(self.wk.get_variable("RDH"), 0., places=8)
+            self.assertAlmostEqual(self.wk.get_variable("HIKILLFACTOR"), 0.,
+                                   places=8)
+            self.wk.integrate(day)
+        self.assertAlmostEqual(self.wk.get_variable("HARDINDEX"), 1.1,
+                               places=8)
+        self.assertAlmostEqual(self.wk.get_variable("HIKILLTEMP"), -12.6,
+                               places=8)
+
+        # Four days of stage 2 hardening under frost: RH = CWWK_HC_S2
+        for i in range(4):
+            drv = self.CrownTemps(TEMP_CROWN=-0.5, TMIN_CROWN=-5.,
+                                  TMAX_CROWN=0.)
+            self.wk.calc_rates(day, drv)
+            self.assertAlmostEqual(self.wk.get_variable("RH"), 0.1, places=8)
+            self.wk.integrate(day)
+        self.assertAlmostEqual(self.wk.get_variable("HIKILLTEMP"), -15.,
+                               places=8)
+
+        # A warm day causes dehardening: RDH = (10-TMAX_CROWN)*CWWK_DHC
+        drv = self.CrownTemps(TEMP_CROWN=9., TMIN_CROWN=5., TMAX_CROWN=12.)
+        self.wk.calc_rates(day, drv)
+        self.assertAlmostEqual(self.wk.get_variable("RH"), 0., places=8)
+        self.assertAlmostEqual(self.wk.get_variable("RDH"), -0.04, places=8)
+
+        # Partial kill: TMIN_CROWN between HIKILLTEMP and CWWK_KILLTEMP.
+        # KF = (0.02*1.5 - 0.1)*((-14*0.85) + (-6*0.15) + 10) = 0.196
+        drv = self.CrownTemps(TEMP_CROWN=-10., TMIN_CROWN=-14., TMAX_CROWN=-6.)
+        self.wk.calc_rates(day, drv)
+        self.assertAlmostEqual(self.wk.get_variable("HIKILLFACTOR"), 0.196,
+                               places=8)
+
+        # Complete kill below the current kill temperature
+        drv = self.CrownTemps(TEMP_CROWN=-16., TMIN_CROWN=-16., TMAX_CROWN=-10.)
+        self.wk.calc_rates(day, drv)
+        self.assertAlmostEqual(self.wk.get_variable("HIKILLFACTOR"), 1.,
+                               places=8)
+
 def suite():
     """ This defines all the tests of a module"""
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(Test_FROSTOL))
+    suite.addTest(unittest.makeSuite(Test_FROSTOL_series))
+    suite.addTest(unittest.makeSuite(Test_FROSTOL_zerofy_bypass))
+    suite.addTest(unittest.makeSuite(Test_CERESWinterKill))
     return suite
 
 if __name__ == '__main__':
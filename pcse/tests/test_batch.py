@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2004-2015 Alterra, Wageningen-UR
+import unittest
+from datetime import date
+from math import sin, pi
+from collections import namedtuple
+
+from ..batch import (run_frostol, run_frostol_ensemble, WeatherArrays,
+                     lt50t_closed_form, _lt50t_ensemble_recurrence)
+from ..crop.abioticdamage import FROSTOL
+from ..base_classes import (VariableKiosk, WeatherDataProvider,
+                            WeatherDataContainer)
+
+# Minimal driving variables container for the scalar reference run
+DrivingVariables = namedtuple("DrivingVariables",
+                              ["TMIN", "TMAX", "TEMP", "SNOWDEPTH"])
+
+#------------------------------------------------------------------------------
+class Test_run_frostol(unittest.TestCase):
+    """Tests that the batch runner reproduces the results of stepping
+    CrownTemperature and FROSTOL through the daily interface on a
+    synthetic winter weather series.
+    """
+
+    test_vars = ["TMIN_CROWN", "TMAX_CROWN", "TEMP_CROWN", "RH", "RDH_TEMP",
+                 "RDH_RESP", "RDH_TSTR", "RF_FROST", "LT50T"]
+    parvalues = {"LT50C": -24., "IDSL": 2, "FROSTOL_D": 0.000027,
+                 "FROSTOL_H": 0.0093, "FROSTOL_R": 0.54, "FROSTOL_S": 1.9,
+                 "FROSTOL_SDBASE": 0., "FROSTOL_SDMAX": 12.5,
+                 "FROSTOL_KILLCF": 1.019, "ISNOWSRC": 0, "CROWNTMPA": 0.2,
+                 "CROWNTMPB": 0.5}
+
+    def setUp(self):
+        # Synthetic but deterministic weather: a sinusoidal annual cycle
+        # with a cold mid-winter period and a snow pack building up and
+        # melting away again.
+        self.ndays = 300
+        self.weather = []
+        for t in range(self.ndays):
+            temp = 8. - 18.*sin(pi*(t + 30.)/300.)
+            tmin = temp - 4. + 2.*sin(7.*t)
+            tmax = temp + 4. + 2.*sin(11.*t)
+            snow_depth = max(0., 20.*sin(pi*(t - 90.)/120.)) if t > 90 else 0.
+            self.weather.append(DrivingVariables(TMIN=tmin, TMAX=tmax,
+                                                 TEMP=temp,
+                                                 SNOWDEPTH=snow_depth))
+
+    def runTest(self):
+        start_day = date(2000, 1, 1)
+
+        batch = run_frostol(self.parvalues,
+                            [w.TMIN for w in self.weather],
+                            [w.TMAX for w in self.weather],
+                            [w.TEMP for w in self.weather],
+                            [w.SNOWDEPTH for w in self.weather],
+                            isVernalized=False, start_day=start_day)
+
+        # Reference run through the daily interface
+        kiosk = VariableKiosk()
+        kiosk.register_variable(0, "ISVERNALISED", type="S", publish=True)
+        kiosk.set_variable(0, "ISVERNALISED", False)
+        frostol = FROSTOL(start_day, kiosk, self.parvalues)
+        for t, drv in enumerate(self.weather):
+            frostol.calc_rates(t, drv)
+            for var in self.test_vars:
+                refvalue = frostol.get_variable(var)
+                self.assertAlmostEqual(refvalue, batch[var][t], places=8)
+            frostol.integrate(t)
+            self.assertEqual(frostol.get_variable("IDFST"), batch["IDFST"][t])
+
+#------------------------------------------------------------------------------
+class Test_run_frostol_float32(Test_run_frostol):
+    """Tests single precision execution of the batch winter-kill chain:
+    float32 weather arrays must be processed in float32 throughout and
+    agree with the double precision reference far within the biological
+    accuracy of the frost model.
+    """
+
+    def runTest(self):
+        import numpy as np
+
+        args = ([w.TMIN for w in self.weather],
+                [w.TMAX for w in self.weather],
+                [w.TEMP for w in self.weather],
+                [w.SNOWDEPTH for w in self.weather])
+        ref = run_frostol(self.parvalues, *args, isVernalized=False)
+        args32 = tuple(np.asarray(a, dtype=np.float32) for a in args)
+        batch = run_frostol(self.parvalues, *args32, isVernalized=False)
+
+        self.assertEqual(batch["LT50T"].dtype, np.float32)
+        self.assertEqual(batch["RF_FROST"].dtype, np.float32)
+        self.assertTrue(np.max(np.abs(batch["LT50T"] -
+                                      ref["LT50T"])) < 0.01)
+        self.assertTrue(np.max(np.abs(batch["RF_FROST"] -
+                                      ref["RF_FROST"])) < 1.E-3)
+
+#------------------------------------------------------------------------------
+class Test_run_frostol_ensemble(Test_run_frostol):
+    """Tests that every member of an ensemble run produces the same
+    results as a single-member run with the member's own parameters and
+    weather.
+    """
+
+    ensemble_vars = ["TMIN_CROWN", "TMAX_CROWN", "TEMP_CROWN", "RH",
+                     "RDH_TEMP", "RDH_RESP", "RDH_TSTR", "RF_FROST",
+                     "LT50T", "IDFST"]
+
+    def runTest(self):
+        import numpy as np
+
+        # Three members: varying parameters and shifted weather
+        parvalues_list = []
+        weather_rows = {"TMIN": [], "TMAX": [], "TEMP": [], "SNOWDEPTH": []}
+        for i, (lt50c, shift) in enumerate([(-24., 0.), (-20., -2.), (-28., 1.5)]):
+            parvalues = dict(self.parvalues)
+            parvalues["LT50C"] = lt50c
+            parvalues["FROSTOL_H"] = self.parvalues["FROSTOL_H"]*(1. + 0.1*i)
+            parvalues_list.append(parvalues)
+            weather_rows["TMIN"].append([w.TMIN + shift for w in self.weather])
+            weather_rows["TMAX"].append([w.TMAX + shift for w in self.weather])
+            weather_rows["TEMP"].append([w.TEMP + shift for w in self.weather])
+            weather_rows["SNOWDEPTH"].append([w.SNOWDEPTH for w in self.weather])
+
+        ensemble = run_frostol_ensemble(parvalues_list,
+                                        weather_rows["TMIN"],
+                                        weather_rows["TMAX"],
+                                        weather_rows["TEMP"],
+                                        weather_rows["SNOWDEPTH"],
+                                        isVernalized=False)
+
+        for i, parvalues in enumerate(parvalues_list):
+            single = run_frostol(parvalues, weather_rows["TMIN"][i],
+                                 weather_rows["TMAX"][i],
+                                 weather_rows["TEMP"][i],
+                                 weather_rows["SNOWDEPTH"][i],
+                                 isVernalized=False)
+            for var in self.ensemble_vars:
+                diff = np.max(np.abs(ensemble[var][i] - single[var]))
+                self.assertTrue(diff < 1.E-10,
+                                "member %i differs for %s" % (i, var))
+
+#------------------------------------------------------------------------------
+class Test_lt50t_closed_form(unittest.TestCase):
+    """Tests the closed-form segment evaluation of the LT50T recurrence
+    against the serial reference recurrence, on a multi-year coefficient
+    series that exercises frost days (serial fallback), clip events and
+    long analytic stretches.
+    """
+
+    def runTest(self):
+        import numpy as np
+
+        LT50C = -24.
+        LT50I = -4.008
+        FROSTOL_S = 1.9
+        ndays = 1200
+
+        t = np.arange(ndays, dtype=np.float64)
+        # annual temperature cycle between roughly -8 and +28 C
+        temp_crown = 10. - 18.*np.sin(2.*pi*t/365.)
+        hcoef = 0.0093*np.clip(10. - temp_crown, 0., 10.)
+        u = np.clip(temp_crown + 4., 0., None)
+        dcoef = 2.7E-5*(u*u*u)
+        # occasional strong respiration stress, also on warm days so that
+        # the upper limit triggers inside an analytic stretch
+        rdh_resp = np.where(np.sin(2.*pi*t/365. + 1.) > 0.8, 0.4, 0.)
+
+        # serial reference through the ensemble recurrence with 1 member
+        LT50T_ref = np.empty((1, ndays))
+        RDH_TSTR_ref = np.empty((1, ndays))
+        _lt50t_ensemble_recurrence(
+            np.ascontiguousarray(hcoef[np.newaxis, :]),
+            np.ascontiguousarray(dcoef[np.newaxis, :]),
+            np.ascontiguousarray(rdh_resp[np.newaxis, :]),
+            np.ascontiguousarray(temp_crown[np.newaxis, :]),
+            np.array([LT50I]), np.array([LT50C]), np.array([LT50I]),
+            np.array([FROSTOL_S]), LT50T_ref, RDH_TSTR_ref)
+
+        LT50T = lt50t_closed_form(hcoef, dcoef, rdh_resp, temp_crown,
+                                  LT50I, LT50C, LT50I, FROSTOL_S)
+        self.assertTrue(np.max(np.abs(LT50T - LT50T_ref[0])) < 1.E-8)
+
+        # the series must actually contain hardened winters and clipped
+        # values at the dehardened limit, otherwise the test is trivial
+        self.assertTrue(np.min(LT50T_ref) < -20.)
+        self.assertTrue(np.any(LT50T_ref == LT50I))
+
+#------------------------------------------------------------------------------
+class Test_WeatherArrays(unittest.TestCase):
+    """Tests stacking of daily weather records into the structure-of-arrays
+    container used by the batch kernels.
+    """
+
+    def runTest(self):
+        wdp = WeatherDataProvider()
+        start_day = date(2000, 1, 1)
+        ndays = 5
+        for t in range(ndays):
+            day = date(2000, 1, 1 + t)
+            wdc = WeatherDataContainer(LAT=52., LON=5., ELEV=10., DAY=day,
+                                       IRRAD=5.0E5, TMIN=-5. + t, TMAX=2. + t,
+                                       VAP=5., RAIN=0.1, E0=0.1, ES0=0.1,
+                                       ET0=0.1, WIND=2., SNOWDEPTH=2.*t)
+            wdp._store_WeatherDataContainer(wdc, day)
+
+        weather = WeatherArrays.from_provider(wdp, start_day,
+                                              date(2000, 1, ndays))
+        self.assertEqual(len(weather), ndays)
+        for t in range(ndays):
+            self.assertEqual(weather.days[t], date(2000, 1, 1 + t))
+            self.assertAlmostEqual(weather.TMIN[t], -5. + t, places=5)
+            self.assertAlmostEqual(weather.TMAX[t], 2. + t, places=5)
+            # TEMP is not provided and must default to (TMIN+TMAX)/2
+            self.assertAlmostEqual(weather.TEMP[t], (-3. + 2*t)/2., places=5)
+            self.assertAlmostEqual(weather.SNOWDEPTH[t], 2.*t, places=5)
+
+def suite():
+    """ This defines all the tests of a module"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_run_frostol))
+    suite.addTest(unittest.makeSuite(Test_run_frostol_float32))
+    suite.addTest(unittest.makeSuite(Test_run_frostol_ensemble))
+    suite.addTest(unittest.makeSuite(Test_lt50t_closed_form))
+    suite.addTest(unittest.makeSuite(Test_WeatherArrays))
+    return suite
+
+if __name__ == '__main__':
+   unittest.TextTestRunner(verbosity=2).run(suite())
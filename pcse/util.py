@@ -939,6 +939,32 @@ def is_a_dekad(day):
 
     return False
 
+def specialized_dispatcher(name, argnames, methods):
+    """Generates a function <name>(<argnames>) that calls each of the bound
+    methods in order, forwarding its arguments unchanged.
+
+    The methods are resolved once and placed in the globals of the generated
+    function, so calling the dispatcher costs no attribute lookups on the
+    sub-objects and no extra forwarding logic. This is used to specialize
+    the daily step of wrapper SimulationObjects that merely pass
+    calc_rates()/integrate() on to their sub-models, such as
+    `WaterbalanceFDSnow`.
+
+    :param name: name of the generated function
+    :param argnames: sequence of argument names, e.g. ["day", "drv"]
+    :param methods: sequence of bound methods to call in order
+    """
+    args = ", ".join(argnames)
+    lines = ["def %s(%s):" % (name, args)]
+    namespace = {}
+    for i, method in enumerate(methods):
+        lines.append("    _method%i(%s)" % (i, args))
+        namespace["_method%i" % i] = method
+    code = compile("\n".join(lines), "<dispatcher %s>" % name, "exec")
+    exec(code, namespace)
+    return namespace[name]
+
+
 def load_SQLite_dump_file(dump_file_name, SQLite_db_name):
     """Build an SQLite database <SQLite_db_name> from dump file <dump_file_name>.
     """
@@ -18,6 +18,27 @@ def read(*filenames, **kwargs):
 
 long_description = read('README.rst')
 
+# Optionally build the ahead-of-time compiled frost damage kernels
+# (pcse_frost_native) with numba.pycc. PCSE is fully functional without
+# them: at runtime pcse.crop.abioticdamage falls back to JIT compilation
+# or the pure python kernels.
+ext_modules = []
+try:
+    from pcse.crop._frost_aot import cc
+    ext_modules.append(cc.distutils_extension())
+except Exception:
+    pass
+
+# Optionally build the Cython implementation of the same kernels
+# (pcse/crop/_abiotic_c.pyx), which takes precedence over numba at
+# runtime when present.
+try:
+    from Cython.Build import cythonize
+    ext_modules.extend(cythonize(os.path.join('pcse', 'crop',
+                                              '_abiotic_c.pyx')))
+except Exception:
+    pass
+
 setup(
     name='PCSE',
     #version=pcse.__version__,
@@ -41,6 +62,7 @@ setup(
 #        '': ['*.txt', '*.rst', '*.conf', '*.csv', '*.sql'],
 #    },
     platforms='any',
+    ext_modules=ext_modules,
     test_suite='pcse.tests.make_test_suite',
     use_2to3=True,
     classifiers=[